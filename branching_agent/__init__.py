@@ -1,2 +1,4 @@
-__all__ = ["build_app"]
+__all__ = ["build_app", "TurnCoalescer", "WorkerPool"]
 from .graph import build_app
+from .coalesce import TurnCoalescer
+from .workers import WorkerPool
@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Iterator
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Serializer: binary + zlib
+# -----------------------
+
+_ZLIB_PREFIX = "zlib+"
+
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Wraps LangGraph's JsonPlusSerializer (msgpack encoding) and zlib-compresses
+    payloads above `min_size` bytes. Compressed payloads carry a "zlib+" type
+    tag, so uncompressed checkpoints written earlier still load.
+    """
+
+    def __init__(self, inner: SerializerProtocol | None = None, *, level: int = 6, min_size: int = 256) -> None:
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_size = min_size
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+        return _ZLIB_PREFIX + type_, zlib.compress(data, self.level)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.startswith(_ZLIB_PREFIX):
+            return self.inner.loads_typed((type_[len(_ZLIB_PREFIX) :], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+
+# -----------------------
+# Retention policy (shared by both savers)
+# -----------------------
+
+RETENTION_MODES = ("latest", "turns")
+
+
+def select_checkpoints_to_keep(entries: list[tuple[str, str | None, str | None]], *, mode: str, keep_last: int) -> set[str]:
+    """
+    Pick the checkpoint ids to keep for one thread/namespace.
+    `entries` are (checkpoint_id, metadata source, parent_id) tuples.
+
+    Modes:
+      - "latest": keep the newest `keep_last` checkpoints.
+      - "turns":  keep the end-of-turn checkpoints of the last `keep_last` turns
+                  (with the input checkpoint that follows each), plus the newest
+                  checkpoint (needed to resume).
+    """
+    # Checkpoint ids are time-ordered (uuid6), so sorting gives chronological order.
+    ordered = sorted(entries)
+    if not ordered:
+        return set()
+
+    if mode == "latest":
+        return {cid for cid, _, _ in ordered[-keep_last:]}
+
+    # A turn starts with an "input" checkpoint; its parent is where the previous turn ended.
+    # Both are kept: dropping the input checkpoint would make its boundary unfindable next time.
+    ids = {cid for cid, _, _ in ordered}
+    boundaries: list[set[str]] = []
+    for cid, source, parent_id in ordered:
+        if source == "input":
+            boundaries.append({cid, parent_id} if parent_id in ids else {cid})
+    keep = {ordered[-1][0]}
+    for pair in boundaries[-keep_last:]:
+        keep |= pair
+    return keep
+
+
+class BackgroundCompactor:
+    """
+    Runs `prune(thread_id)` off the request path for threads marked dirty by `put`.
+    A failed prune (e.g. "database is locked" under several writers) is logged and
+    retried after `retry_s`, so one error never stops retention for the process.
+    """
+
+    def __init__(self, prune: Callable[[str], Any], *, name: str = "checkpoint-compactor", retry_s: float = 1.0) -> None:
+        self._prune = prune
+        self.retry_s = retry_s
+        self._lock = threading.Lock()
+        self._dirty: set[str] = set()
+        self._wake = threading.Event()
+        threading.Thread(target=self._loop, name=name, daemon=True).start()
+
+    def mark(self, thread_id: str) -> None:
+        with self._lock:
+            self._dirty.add(thread_id)
+        self._wake.set()
+
+    def discard(self, thread_id: str) -> None:
+        with self._lock:
+            self._dirty.discard(thread_id)
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait()
+            with self._lock:
+                self._wake.clear()
+                dirty, self._dirty = self._dirty, set()
+            failed: list[str] = []
+            for thread_id in dirty:
+                try:
+                    self._prune(thread_id)
+                except Exception:
+                    logger.exception("Checkpoint pruning failed for thread %s; will retry.", thread_id)
+                    failed.append(thread_id)
+
+            if failed:
+                time.sleep(self.retry_s)
+                for thread_id in failed:
+                    self.mark(thread_id)
+
+
+# -----------------------
+# Checkpointer: in-memory with retention pruning
+# -----------------------
+
+class CompactingInMemorySaver(InMemorySaver):
+    """
+    InMemorySaver that prunes old checkpoints per thread_id in a background thread,
+    following `select_checkpoints_to_keep`. Pending writes and channel blobs that
+    only pruned checkpoints referenced are dropped too.
+    """
+
+    def __init__(
+        self,
+        *,
+        serde: SerializerProtocol | None = None,
+        keep_last: int = 8,
+        mode: str = "latest",
+    ) -> None:
+        super().__init__(serde=serde)
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode: {mode}")
+        self.keep_last = max(1, int(keep_last))
+        self.mode = mode
+
+        # InMemorySaver is not thread-safe; the compactor shares storage with the graph.
+        self._lock = threading.RLock()
+        self._compactor = BackgroundCompactor(self.prune)
+
+    # --- locked pass-throughs
+
+    def get_tuple(self, config: Any) -> Any:
+        with self._lock:
+            return super().get_tuple(config)
+
+    def list(self, config: Any, *args: Any, **kwargs: Any) -> Iterator[Any]:
+        with self._lock:
+            items = [*super().list(config, *args, **kwargs)]
+        yield from items
+
+    def put(self, config: Any, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            out = super().put(config, *args, **kwargs)
+        self._compactor.mark(str(config["configurable"]["thread_id"]))
+        return out
+
+    def put_writes(self, config: Any, *args: Any, **kwargs: Any) -> None:
+        with self._lock:
+            super().put_writes(config, *args, **kwargs)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            super().delete_thread(thread_id)
+        self._compactor.discard(str(thread_id))
+
+    # --- compaction
+
+    def prune(self, thread_id: str) -> int:
+        """Apply the retention policy to one thread. Returns the number of checkpoints removed."""
+        removed = 0
+        with self._lock:
+            namespaces = self.storage.get(thread_id) or {}
+            for ns, checkpoints in namespaces.items():
+                entries = [
+                    (cid, (self.serde.loads_typed(metadata) or {}).get("source"), parent_id)
+                    for cid, (_, metadata, parent_id) in checkpoints.items()
+                ]
+                keep = select_checkpoints_to_keep(entries, mode=self.mode, keep_last=self.keep_last)
+                drop = [cid for cid in checkpoints if cid not in keep]
+                for cid in drop:
+                    del checkpoints[cid]
+                    self.writes.pop((thread_id, ns, cid), None)
+                removed += len(drop)
+                if drop:
+                    self._prune_blobs(thread_id, ns, checkpoints)
+        return removed
+
+    def _prune_blobs(self, thread_id: str, ns: str, checkpoints: dict[str, Any]) -> None:
+        # Older InMemorySaver versions keep channel values inline and have no blob store.
+        blobs = getattr(self, "blobs", None)
+        if not blobs:
+            return
+
+        referenced: set[tuple[str, Any]] = set()
+        for checkpoint, _, _ in checkpoints.values():
+            versions = (self.serde.loads_typed(checkpoint) or {}).get("channel_versions") or {}
+            referenced.update(versions.items())
+
+        for key in [k for k in blobs if k[0] == thread_id and k[1] == ns]:
+            if (key[2], key[3]) not in referenced:
+                del blobs[key]
+
+
+# -----------------------
+# Checkpointer: durable SQLite
+# -----------------------
+
+def sqlite_saver(
+    path: str,
+    *,
+    serde: SerializerProtocol | None = None,
+    keep_last: int = 8,
+    mode: str = "latest",
+) -> Any:
+    """
+    Durable checkpointer shared by worker processes (needs `langgraph-checkpoint-sqlite`),
+    pruned with the same retention policy as the in-memory saver.
+    WAL mode lets several processes read while one writes.
+    """
+    try:
+        from .checkpoint_sqlite import CompactingSqliteSaver
+    except ImportError as e:
+        raise RuntimeError("CHECKPOINT_DB requires: pip install langgraph-checkpoint-sqlite") from e
+
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return CompactingSqliteSaver(conn, serde=serde, keep_last=keep_last, mode=mode)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import Any
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from .checkpoint import RETENTION_MODES, BackgroundCompactor, select_checkpoints_to_keep
+
+
+class CompactingSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver that deletes old `checkpoints` / `writes` rows per thread_id in a
+    background thread, following `select_checkpoints_to_keep`. Freed pages are
+    reused by SQLite, so the file stops growing once threads reach their cap.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        serde: SerializerProtocol | None = None,
+        keep_last: int = 8,
+        mode: str = "latest",
+    ) -> None:
+        super().__init__(conn, serde=serde)
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown retention mode: {mode}")
+        self.keep_last = max(1, int(keep_last))
+        self.mode = mode
+        self._compactor = BackgroundCompactor(self.prune, name="sqlite-compactor")
+
+    def put(self, config: Any, *args: Any, **kwargs: Any) -> Any:
+        out = super().put(config, *args, **kwargs)
+        self._compactor.mark(str(config["configurable"]["thread_id"]))
+        return out
+
+    def prune(self, thread_id: str) -> int:
+        """Apply the retention policy to one thread. Returns the number of checkpoints removed."""
+        # cursor() holds the saver's lock and commits, so graph reads never see a half-pruned thread.
+        with self.cursor() as cur:
+            cur.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_checkpoint_id, metadata FROM checkpoints WHERE thread_id = ?",
+                (thread_id,),
+            )
+            by_ns: dict[str, list[tuple[str, str | None, str | None]]] = {}
+            for ns, cid, parent_id, metadata in cur.fetchall():
+                source = (json.loads(metadata) if metadata else {}).get("source")
+                by_ns.setdefault(ns, []).append((cid, source, parent_id))
+
+            drop: list[tuple[str, str, str]] = []
+            for ns, entries in by_ns.items():
+                keep = select_checkpoints_to_keep(entries, mode=self.mode, keep_last=self.keep_last)
+                drop.extend((thread_id, ns, cid) for cid, _, _ in entries if cid not in keep)
+
+            cur.executemany(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                drop,
+            )
+            cur.executemany(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                drop,
+            )
+        return len(drop)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class _PendingTurn:
+    texts: list[str] = field(default_factory=list)
+    futures: list[Future] = field(default_factory=list)
+    # Set once the window elapsed but the thread was still busy with a previous turn.
+    due: bool = False
+
+
+class TurnCoalescer:
+    """
+    Per-thread coalescing front for the compiled graph.
+
+    Messages for the same thread_id that arrive within `window_s` of the first
+    one, or while a turn for that thread is still running, are merged into a
+    single `ingest` (joined by newlines). Every caller of a merged batch gets
+    the same final state, so superseded messages cost no extra LLM calls.
+    """
+
+    def __init__(self, app: Any, *, window_s: float = 0.4) -> None:
+        self.app = app
+        self.window_s = max(0.0, float(window_s))
+        self.turns_run = 0
+        self.turns_coalesced = 0
+
+        self._lock = threading.Lock()
+        self._pending: dict[str, _PendingTurn] = {}
+        self._running: set[str] = set()
+
+    def submit(self, thread_id: str, user_input: str) -> Future:
+        fut: Future = Future()
+        with self._lock:
+            turn = self._pending.get(thread_id)
+            if turn is None:
+                turn = _PendingTurn()
+                self._pending[thread_id] = turn
+                timer = threading.Timer(self.window_s, self._flush, args=(thread_id,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.turns_coalesced += 1
+            turn.texts.append(user_input)
+            turn.futures.append(fut)
+        return fut
+
+    def invoke(self, thread_id: str, user_input: str, *, timeout_s: float | None = None) -> dict[str, Any]:
+        return self.submit(thread_id, user_input).result(timeout=timeout_s)
+
+    def _flush(self, thread_id: str) -> None:
+        with self._lock:
+            turn = self._pending.get(thread_id)
+            if turn is None:
+                return
+            # One turn per thread at a time; the running turn re-flushes us when done.
+            if thread_id in self._running:
+                turn.due = True
+                return
+            del self._pending[thread_id]
+            self._running.add(thread_id)
+
+        try:
+            text = "\n".join(t.strip() for t in turn.texts if t.strip())
+            cfg = {"configurable": {"thread_id": thread_id}}
+            out = self.app.invoke({"user_input": text}, config=cfg)
+            for fut in turn.futures:
+                fut.set_result(out)
+        except Exception as e:
+            for fut in turn.futures:
+                fut.set_exception(e)
+        finally:
+            with self._lock:
+                self.turns_run += 1
+                self._running.discard(thread_id)
+                nxt = self._pending.get(thread_id)
+                again = nxt is not None and nxt.due
+
+            if again:
+                threading.Thread(target=self._flush, args=(thread_id,), daemon=True).start()
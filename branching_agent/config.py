@@ -10,7 +10,18 @@ class Settings:
     openrouter_model: str
     openrouter_app_url: str | None
     openrouter_app_name: str | None
+    planner_models: tuple[str, ...]
+    extractor_models: tuple[str, ...]
+    final_models: tuple[str, ...]
+    adaptive_models: bool
     max_steps: int
+    checkpoint_keep_last: int
+    checkpoint_retention: str
+    checkpoint_db: str | None
+    profile_store_dir: str | None
+    profile_max_facts: int
+    template_answers: bool
+    coalesce_window_ms: int
 
     @staticmethod
     def load() -> "Settings":
@@ -22,13 +33,53 @@ class Settings:
         app_url = os.getenv("OPENROUTER_APP_URL", "").strip() or None
         app_name = os.getenv("OPENROUTER_APP_NAME", "").strip() or None
 
+        # Per-node models: comma-separated, first is primary, the rest are fallbacks.
+        def models(var: str) -> tuple[str, ...]:
+            raw = os.getenv(var, "").split(",")
+            return tuple(m.strip() for m in raw if m.strip()) or (model,)
+
+        planner_models = models("OPENROUTER_PLANNER_MODEL")
+        extractor_models = models("OPENROUTER_EXTRACTOR_MODEL")
+        final_models = models("OPENROUTER_FINAL_MODEL")
+        # Reorder candidates by observed p95 latency / JSON validity instead of config order.
+        adaptive_models = os.getenv("ADAPTIVE_MODELS", "0").strip().lower() in {"1", "true", "yes"}
+
         # Step cap prevents infinite loops / runaway cost.
         max_steps = int(os.getenv("MAX_STEPS", "3"))
 
+        # Checkpoint retention per thread_id: "latest" N checkpoints or last N "turns".
+        keep_last = int(os.getenv("CHECKPOINT_KEEP_LAST", "8"))
+        retention = os.getenv("CHECKPOINT_RETENTION", "latest").strip().lower()
+        if retention not in {"latest", "turns"}:
+            raise RuntimeError("CHECKPOINT_RETENTION must be 'latest' or 'turns'.")
+        # SQLite file for durable checkpoints (required by worker mode); in-memory if empty.
+        checkpoint_db = os.getenv("CHECKPOINT_DB", "").strip() or None
+
+        # Profile memory lives outside graph state; only relevant facts reach prompts.
+        profile_dir = os.getenv("PROFILE_STORE_DIR", "").strip() or None
+        profile_max_facts = int(os.getenv("PROFILE_MAX_FACTS", "6"))
+
+        # Render calc-only / remember-only answers locally instead of calling the LLM.
+        template_answers = os.getenv("TEMPLATE_ANSWERS", "1").strip().lower() in {"1", "true", "yes"}
+
+        # Merge bursts of messages per thread_id into one turn (0 = off).
+        coalesce_window_ms = int(os.getenv("COALESCE_WINDOW_MS", "0"))
+
         return Settings(
             openrouter_api_key=key,
             openrouter_model=model,
             openrouter_app_url=app_url,
             openrouter_app_name=app_name,
+            planner_models=planner_models,
+            extractor_models=extractor_models,
+            final_models=final_models,
+            adaptive_models=adaptive_models,
             max_steps=max_steps,
+            checkpoint_keep_last=keep_last,
+            checkpoint_retention=retention,
+            checkpoint_db=checkpoint_db,
+            profile_store_dir=profile_dir,
+            profile_max_facts=profile_max_facts,
+            template_answers=template_answers,
+            coalesce_window_ms=coalesce_window_ms,
         )
@@ -3,13 +3,17 @@ from __future__ import annotations
 from typing import Any, TypedDict
 
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
-from langgraph.checkpoint.memory import InMemorySaver
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, StateGraph
 
+from .checkpoint import CompactingInMemorySaver, CompressedSerializer, sqlite_saver
 from .config import Settings
+from .memory import ProfileStore
+from .models import ModelSelector, NodeClient
 from .openrouter import OpenRouterClient
 from .prompts import FINAL_SYSTEM, PLANNER_SYSTEM
 from .schemas import RouteDecision
+from .templates import render_simple_answer
 from .tools import RememberTool, safe_calc, wiki_summary
 from .util import extract_first_json_object
 
@@ -18,7 +22,7 @@ class AgentState(TypedDict, total=False):
     # Conversation
     messages: list[BaseMessage]
 
-    # Persistent memory (profile facts)
+    # Profile facts relevant to this turn (full memory lives in ProfileStore)
     profile: dict[str, str]
 
     # Per-turn scratchpad with tool outputs
@@ -32,8 +36,11 @@ class AgentState(TypedDict, total=False):
     user_input: str
     final_answer: str
 
+    # Stats: final LLM calls replaced by template answers (cumulative per thread)
+    llm_calls_skipped: int
 
-def build_app() -> Any:
+
+def build_app(*, profile_dir: str | None = None) -> Any:
     settings = Settings.load()
     llm = OpenRouterClient(
         api_key=settings.openrouter_api_key,
@@ -41,16 +48,35 @@ def build_app() -> Any:
         app_url=settings.openrouter_app_url,
         app_name=settings.openrouter_app_name,
     )
-    remember = RememberTool(llm=llm)
+    # Each node gets its own candidate models and its own selector: latency and JSON validity
+    # differ per prompt, so one node's failures must not demote a model for the others.
+    def node_client(models: tuple[str, ...]) -> NodeClient:
+        return NodeClient(llm=llm, models=models, selector=ModelSelector(adaptive=settings.adaptive_models))
+
+    planner_llm = node_client(settings.planner_models)
+    extractor_llm = node_client(settings.extractor_models)
+    final_llm = node_client(settings.final_models)
+
+    remember = RememberTool(llm=extractor_llm)
+    # Worker mode passes profile_dir explicitly; otherwise PROFILE_STORE_DIR (in-memory if unset).
+    profiles = ProfileStore(profile_dir or settings.profile_store_dir)
+
+    def user_id_of(config: RunnableConfig) -> str:
+        configurable = (config or {}).get("configurable") or {}
+        return str(configurable.get("user_id") or configurable.get("thread_id") or "default")
 
-    def ingest(state: AgentState) -> AgentState:
+    def ingest(state: AgentState, config: RunnableConfig) -> AgentState:
         text = (state.get("user_input") or "").strip()
         messages = list(state.get("messages") or [])
         messages.append(HumanMessage(content=text))
 
+        # Only facts relevant to this message go into the prompts.
+        profile = profiles.relevant(user_id_of(config), text, limit=settings.profile_max_facts)
+
         # Reset per-turn scratchpad + step counter.
         return {
             "messages": messages,
+            "profile": profile,
             "scratchpad": [],
             "step": 0,
         }
@@ -84,7 +110,7 @@ def build_app() -> Any:
 
         # Retry once if JSON invalid.
         for attempt in range(2):
-            text = llm.chat_completion(messages, temperature=0.0, response_format_json=True)
+            text = planner_llm.chat_completion(messages, temperature=0.0, response_format_json=True)
             try:
                 payload = extract_first_json_object(text)
                 decision = RouteDecision.model_validate(payload).model_dump()
@@ -142,7 +168,7 @@ def build_app() -> Any:
 
         return {"scratchpad": scratch}
 
-    def tool_remember(state: AgentState) -> AgentState:
+    def tool_remember(state: AgentState, config: RunnableConfig) -> AgentState:
         decision = state.get("router") or {}
         msg = (decision.get("tool_input") or "").strip()
         if not msg:
@@ -152,6 +178,7 @@ def build_app() -> Any:
         scratch = list(state.get("scratchpad") or [])
 
         facts = remember.extract_facts(msg)
+        profiles.upsert(user_id_of(config), facts)
         profile.update(facts)
 
         scratch.append({"tool": "remember", "input": msg, "result": {"facts": facts}})
@@ -167,24 +194,31 @@ def build_app() -> Any:
         if msgs and isinstance(msgs[-1], HumanMessage):
             last_user = msgs[-1].content or ""
 
-        final_user = {
-            "user_message": last_user,
-            "profile": profile,
-            "scratchpad": scratch,
-        }
+        skipped = int(state.get("llm_calls_skipped") or 0)
 
-        messages = [
-            {"role": "system", "content": FINAL_SYSTEM},
-            {"role": "user", "content": str(final_user)},
-        ]
+        # Fast path: simple calc / remember turns are rendered without an LLM call.
+        answer = render_simple_answer(last_user, scratch) if settings.template_answers else None
+        if answer is not None:
+            skipped += 1
+        else:
+            final_user = {
+                "user_message": last_user,
+                "profile": profile,
+                "scratchpad": scratch,
+            }
+
+            messages = [
+                {"role": "system", "content": FINAL_SYSTEM},
+                {"role": "user", "content": str(final_user)},
+            ]
 
-        text = llm.chat_completion(messages, temperature=0.2, response_format_json=False)
-        answer = (text or "").strip()
+            text = final_llm.chat_completion(messages, temperature=0.2, response_format_json=False)
+            answer = (text or "").strip()
 
         msgs.append(AIMessage(content=answer))
 
         # Clear scratchpad after answering (per-turn notes).
-        return {"messages": msgs, "final_answer": answer, "scratchpad": []}
+        return {"messages": msgs, "final_answer": answer, "scratchpad": [], "llm_calls_skipped": skipped}
 
     # -----------------------
     # Graph wiring
@@ -224,5 +258,17 @@ def build_app() -> Any:
     graph.add_edge("remember", "planner")
     graph.add_edge("final", END)
 
-    checkpointer = InMemorySaver()
+    if settings.checkpoint_db:
+        checkpointer = sqlite_saver(
+            settings.checkpoint_db,
+            serde=CompressedSerializer(),
+            keep_last=settings.checkpoint_keep_last,
+            mode=settings.checkpoint_retention,
+        )
+    else:
+        checkpointer = CompactingInMemorySaver(
+            serde=CompressedSerializer(),
+            keep_last=settings.checkpoint_keep_last,
+            mode=settings.checkpoint_retention,
+        )
     return graph.compile(checkpointer=checkpointer)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+
+# -----------------------
+# Profile memory store
+# -----------------------
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "be", "do", "does", "for", "i", "i'm", "in", "is", "it", "me",
+    "my", "of", "on", "or", "so", "the", "to", "what", "whats", "s", "you", "your",
+}
+
+# Extra words that should pull in the common profile keys (see REMEMBER_SYSTEM).
+_KEY_HINTS = {
+    "name": ["called", "call", "who"],
+    "city": ["live", "living", "from", "where", "location", "weather", "local"],
+    "timezone": ["time", "clock", "hour"],
+    "language_preference": ["language", "speak", "translate"],
+    "dietary_preference": ["eat", "food", "diet", "recipe", "meal", "restaurant"],
+    "favorite_topics": ["topic", "interest", "like", "suggest", "recommend"],
+}
+
+# Keys that describe how to answer rather than facts to look up. Matched exactly / by suffix,
+# so lookup facts such as dietary_preference or language_preference stay relevance-ranked.
+_STANDING_KEYS = {"answer_preference"}
+_STANDING_SUFFIX = "_style"
+
+# Messages asking about the profile as a whole get the most recent facts.
+_WHOLE_PROFILE = ("about me", "know about me", "remember about", "my profile", "my preferences", "my facts")
+
+
+def _tokens(text: str) -> set[str]:
+    out: set[str] = set()
+    for tok in _TOKEN.findall(text.lower()):
+        if tok in _STOPWORDS:
+            continue
+        # Cheap plural folding: "topics" ~ "topic".
+        if len(tok) > 3 and tok.endswith("s"):
+            tok = tok[:-1]
+        out.add(tok)
+    return out
+
+
+@dataclass
+class ProfileRecord:
+    key: str
+    value: str
+    version: int = 1
+    updated_at: float = field(default_factory=time.time)
+
+    def terms(self) -> tuple[set[str], set[str]]:
+        key_terms = _tokens(self.key.replace("_", " "))
+        for hint in _KEY_HINTS.get(self.key, []):
+            key_terms |= _tokens(hint)
+        return key_terms, _tokens(self.value)
+
+
+class ProfileStore:
+    """
+    Per-user profile facts kept outside the graph state.
+
+    Each fact is a versioned, timestamped record; a small inverted index over
+    key/value tokens lets `relevant()` pick only the facts that matter for the
+    current message, so prompt size no longer grows with total memory.
+
+    With `path` set, each user's records are persisted as one JSON file in that directory.
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._records: dict[str, dict[str, ProfileRecord]] = {}
+        self._index: dict[str, dict[str, set[str]]] = {}
+
+        if self.path:
+            os.makedirs(self.path, exist_ok=True)
+
+    def upsert(self, user_id: str, facts: dict[str, str]) -> list[ProfileRecord]:
+        changed: list[ProfileRecord] = []
+        with self._lock:
+            records = self._load(user_id)
+            now = time.time()
+            for key, value in facts.items():
+                rec = records.get(key)
+                if rec is None:
+                    rec = ProfileRecord(key=key, value=value, updated_at=now)
+                elif rec.value != value:
+                    rec = ProfileRecord(key=key, value=value, version=rec.version + 1, updated_at=now)
+                else:
+                    continue
+                records[key] = rec
+                changed.append(rec)
+
+            if changed:
+                self._reindex(user_id)
+                self._save(user_id)
+        return changed
+
+    def get(self, user_id: str) -> dict[str, str]:
+        with self._lock:
+            return {k: r.value for k, r in self._load(user_id).items()}
+
+    def relevant(self, user_id: str, text: str, *, limit: int = 6) -> dict[str, str]:
+        """Return up to `limit` facts matching the message by key or by shared tokens."""
+        with self._lock:
+            records = self._load(user_id)
+            if not records or limit <= 0:
+                return {}
+
+            lowered = text.lower()
+            if any(p in lowered for p in _WHOLE_PROFILE):
+                recent = sorted(records.values(), key=lambda r: r.updated_at, reverse=True)
+                return {r.key: r.value for r in recent[:limit]}
+
+            scores: dict[str, float] = {}
+            index = self._index.get(user_id) or {}
+            for tok in _tokens(text):
+                for key in index.get(tok, ()):
+                    rec = records[key]
+                    key_terms, _ = rec.terms()
+                    # Key hits outweigh incidental overlap with the stored value.
+                    scores[key] = scores.get(key, 0.0) + (2.0 if tok in key_terms else 1.0)
+
+            for key in records:
+                if key.replace("_", " ") in lowered:
+                    scores[key] = scores.get(key, 0.0) + 3.0
+                elif key in _STANDING_KEYS or key.endswith(_STANDING_SUFFIX):
+                    # Preferences apply to every reply; they fill leftover slots.
+                    scores.setdefault(key, 0.5)
+
+            ranked = sorted(scores, key=lambda k: (scores[k], records[k].updated_at), reverse=True)
+            return {k: records[k].value for k in ranked[:limit]}
+
+    # --- internals (caller holds the lock)
+
+    def _file(self, user_id: str) -> str:
+        digest = hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:20]
+        return os.path.join(self.path or "", f"{digest}.json")
+
+    def _load(self, user_id: str) -> dict[str, ProfileRecord]:
+        records = self._records.get(user_id)
+        if records is not None:
+            return records
+
+        records = {}
+        if self.path and os.path.exists(self._file(user_id)):
+            with open(self._file(user_id), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for raw in data.get("records", []):
+                rec = ProfileRecord(**raw)
+                records[rec.key] = rec
+
+        self._records[user_id] = records
+        self._reindex(user_id)
+        return records
+
+    def _reindex(self, user_id: str) -> None:
+        index: dict[str, set[str]] = {}
+        for key, rec in self._records.get(user_id, {}).items():
+            key_terms, value_terms = rec.terms()
+            for tok in key_terms | value_terms:
+                index.setdefault(tok, set()).add(key)
+        self._index[user_id] = index
+
+    def _save(self, user_id: str) -> None:
+        if not self.path:
+            return
+        payload = {
+            "user_id": user_id,
+            "records": [asdict(r) for r in self._records.get(user_id, {}).values()],
+        }
+        # Write-then-rename so a crash never leaves a half-written profile.
+        target = self._file(user_id)
+        tmp = f"{target}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False)
+        os.replace(tmp, target)
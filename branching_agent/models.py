@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+from .openrouter import OpenRouterClient
+from .util import extract_first_json_object
+
+
+# -----------------------
+# Per-model call statistics
+# -----------------------
+
+@dataclass
+class _ModelStats:
+    # (timestamp, latency_s, ok); ok = call succeeded and, for JSON calls, returned a parseable object.
+    calls: deque = field(default_factory=lambda: deque(maxlen=50))
+
+    def expire(self, cutoff: float) -> None:
+        while self.calls and self.calls[0][0] < cutoff:
+            self.calls.popleft()
+
+    def p95(self) -> float:
+        ordered = sorted(latency for _, latency, _ in self.calls)
+        return ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)]
+
+    def ok_rate(self) -> float:
+        return sum(ok for _, _, ok in self.calls) / len(self.calls)
+
+
+class ModelSelector:
+    """
+    Orders candidate models for one node (use one selector per node; stats are not
+    comparable across prompts, e.g. JSON validity only applies to JSON calls).
+
+    Static mode keeps the configured order (primary, then fallbacks). Adaptive mode
+    first gives each model `min_samples` calls, then prefers models whose recent
+    success / JSON-validity rate is at least `min_ok_rate`, fastest p95 first.
+
+    Samples older than `max_age_s` are dropped, so a demoted model falls back into
+    warm-up and gets re-tried instead of staying last on stale numbers.
+    """
+
+    def __init__(
+        self,
+        *,
+        adaptive: bool = False,
+        min_samples: int = 5,
+        min_ok_rate: float = 0.9,
+        max_age_s: float = 300.0,
+    ) -> None:
+        self.adaptive = adaptive
+        self.min_samples = min_samples
+        self.min_ok_rate = min_ok_rate
+        self.max_age_s = max_age_s
+        self._lock = threading.Lock()
+        self._stats: dict[str, _ModelStats] = {}
+
+    def order(self, candidates: tuple[str, ...]) -> list[str]:
+        if not self.adaptive or len(candidates) < 2:
+            return list(candidates)
+
+        cutoff = time.monotonic() - self.max_age_s
+        with self._lock:
+            def rank(i: int) -> tuple[int, float, int]:
+                stats = self._stats.get(candidates[i])
+                if stats is not None:
+                    stats.expire(cutoff)
+                if stats is None or len(stats.calls) < self.min_samples:
+                    return (0, 0.0, i)
+                unhealthy = int(stats.ok_rate() < self.min_ok_rate)
+                return (unhealthy, stats.p95(), i)
+
+            return [candidates[i] for i in sorted(range(len(candidates)), key=rank)]
+
+    def record(self, model: str, latency_s: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(model, _ModelStats())
+            stats.calls.append((time.monotonic(), latency_s, ok))
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                m: {"calls": len(s.calls), "p95_s": s.p95(), "ok_rate": s.ok_rate()}
+                for m, s in self._stats.items()
+                if s.calls
+            }
+
+
+# -----------------------
+# Node-scoped client
+# -----------------------
+
+@dataclass(frozen=True)
+class NodeClient:
+    """
+    Drop-in for OpenRouterClient.chat_completion bound to one node's candidate models.
+    Falls through to the next candidate when a call fails; every call feeds the selector.
+    """
+
+    llm: OpenRouterClient
+    models: tuple[str, ...]
+    selector: ModelSelector
+
+    def chat_completion(self, messages: list[dict[str, str]], **kwargs: Any) -> str:
+        last_err: Exception | None = None
+
+        for model in self.selector.order(self.models):
+            start = time.perf_counter()
+            try:
+                text = self.llm.chat_completion(messages, model=model, **kwargs)
+            except Exception as e:
+                self.selector.record(model, time.perf_counter() - start, False)
+                last_err = e
+                continue
+
+            ok = True
+            if kwargs.get("response_format_json"):
+                try:
+                    extract_first_json_object(text)
+                except Exception:
+                    ok = False
+            self.selector.record(model, time.perf_counter() - start, ok)
+            return text
+
+        assert last_err is not None
+        raise last_err
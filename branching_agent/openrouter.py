@@ -29,6 +29,7 @@ class OpenRouterClient:
         *,
         temperature: float = 0.0,
         response_format_json: bool = False,
+        model: str | None = None,
         timeout_s: int = 45,
         max_retries: int = 3,
         backoff_base_s: float = 0.6,
@@ -44,7 +45,7 @@ class OpenRouterClient:
             headers["X-Title"] = self.app_name
 
         base_payload: dict[str, Any] = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
             "temperature": temperature,
         }
@@ -44,6 +44,7 @@ Return ONLY JSON (no markdown). Schema:
 
 Rules:
 - Only store stable, non-sensitive personal facts and preferences.
-- Good keys: name, city, timezone, language_preference, dietary_preference, favorite_topics.
+- Good keys: name, city, timezone, language_preference, dietary_preference, answer_preference, favorite_topics.
+- Store how the user wants replies (e.g. "concise answers", "cite sources when searching") under "answer_preference", or a key ending in "_style" (e.g. "citation_style").
 - If no facts found, return {"facts":{}}.
 """
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import re
+from typing import Any
+
+
+# -----------------------
+# Template answers (no LLM call)
+# -----------------------
+
+_LEAD_INS = re.compile(r"^(what is|what's|whats|calculate|calc|compute|evaluate|solve)\s*:?\s*", re.IGNORECASE)
+
+_ARITHMETIC = re.compile(r"^[0-9+\-*/().%\s^]+$")
+
+# safe_calc errors with a fixed user-facing reason; anything else (syntax errors,
+# overflow, ...) goes to the LLM instead of echoing raw exception text.
+_CALC_ERRORS = {
+    "Division by zero.": "it divides by zero",
+    "Modulo by zero.": "it takes a remainder modulo zero",
+    "Exponent too large.": "the exponent is too large",
+    "Expression too long.": "the expression is too long",
+    "Expression too complex.": "the expression is too complex",
+    "Only finite numbers are allowed.": "a number in it is too large",
+}
+
+# Words that turn a statement into a request the LLM has to answer ("..., recommend a restaurant").
+_REQUEST_WORDS = re.compile(
+    r"\b(what|who|where|when|why|how|which|can you|could you|would you|will you|please|tell|explain|"
+    r"recommend|suggest|give|show|find|search|look up|help|write|make|create|list|describe|summari[sz]e|"
+    r"translate|calculate|compute|remind|plan|book|joke)\b",
+    re.IGNORECASE,
+)
+
+# An auxiliary verb opening a clause makes a question even without "?" ("I live in Berlin, is it raining").
+# Only clause starts count, so statements like "my name is Misha" still qualify.
+_AUX_QUESTION = re.compile(
+    r"(?:^|[,.;:!]\s*|\b(?:and|but|so|also|then)\s+)"
+    r"(?:(is|are|am|was|were|do|does|did|have|has|had|should|shall|will|would|can|could|may|might|must)(?:n['’]t)?|won['’]t)\b",
+    re.IGNORECASE,
+)
+
+
+def _is_bare_expression(user_message: str, expr: str) -> bool:
+    """True when the user sent just the expression, maybe with a lead-in like "what is" or a trailing "=?"."""
+    text = _LEAD_INS.sub("", user_message.strip()).rstrip(" ?=.!")
+    return text.replace(" ", "") == expr.replace(" ", "")
+
+
+def _is_plain_statement(user_message: str, tool_input: str) -> bool:
+    """True when the planner passed the whole message to remember and it asks for nothing."""
+    text = user_message.strip()
+    if tool_input.strip() != text:
+        return False
+    return "?" not in text and not _REQUEST_WORDS.search(text) and not _AUX_QUESTION.search(text)
+
+
+def render_simple_answer(user_message: str, scratch: list[dict[str, Any]]) -> str | None:
+    """
+    Render the final answer locally when the turn fits a known simple pattern:
+      - a single calc result, or a known calc error, for a message that is just an arithmetic expression
+      - a single remember note that stored facts, when the whole message went to remember
+        and it contains no question or request
+    Returns None when the LLM composer is needed.
+    """
+    if len(scratch) != 1:
+        return None
+
+    entry = scratch[0]
+    tool = entry.get("tool")
+    result = entry.get("result") or {}
+    tool_input = str(entry.get("input") or "")
+
+    if tool == "calc" and _ARITHMETIC.match(tool_input) and _is_bare_expression(user_message, tool_input):
+        if "value" in result:
+            return f"{tool_input} = {result['value']}"
+        reason = _CALC_ERRORS.get(str(result.get("error")))
+        if reason:
+            return f"I couldn't compute `{tool_input}` because {reason}. Please check the expression and try again."
+
+    if tool == "remember" and _is_plain_statement(user_message, tool_input):
+        facts = result.get("facts") or {}
+        if facts:
+            stored = "; ".join(f"{k.replace('_', ' ')}: {v}" for k, v in facts.items())
+            return f"Got it, I'll remember that. Saved: {stored}."
+
+    return None
@@ -4,11 +4,12 @@ import ast
 import math
 import re
 from dataclasses import dataclass
-from typing import Any
+from functools import lru_cache
 from urllib.parse import quote
 
 import requests
 
+from .models import NodeClient
 from .openrouter import OpenRouterClient
 from .prompts import REMEMBER_SYSTEM
 from .schemas import ProfileFacts
@@ -81,9 +82,33 @@ def wiki_summary(title: str, *, timeout_s: int = 20) -> dict[str, str]:
 
 _ALLOWED_CHARS = re.compile(r"^[0-9+\-*/().%\s^]+$")
 
-class _SafeEval(ast.NodeVisitor):
+_MAX_LEN = 120
+_MAX_NODES = 64
+
+# Opcodes of the flat postfix program.
+_CONST, _POS, _NEG, _ADD, _SUB, _MUL, _DIV, _FLOORDIV, _MOD, _POW = range(10)
+
+_BINOPS: dict[type, int] = {
+    ast.Add: _ADD,
+    ast.Sub: _SUB,
+    ast.Mult: _MUL,
+    ast.Div: _DIV,
+    ast.FloorDiv: _FLOORDIV,
+    ast.Mod: _MOD,
+    ast.Pow: _POW,
+}
+
+
+@dataclass(frozen=True)
+class _Program:
+    # `consts` are consumed in order by _CONST ops.
+    ops: tuple[int, ...]
+    consts: tuple[float, ...]
+
+
+class _Compiler:
     """
-    AST-based safe evaluator for arithmetic expressions.
+    Compiles an allowlisted arithmetic AST into a flat postfix program.
     Allowed:
       - numbers
       - +, -, *, /, //, %, **, parentheses
@@ -94,100 +119,150 @@ class _SafeEval(ast.NodeVisitor):
     """
 
     def __init__(self) -> None:
-        self.node_count = 0
-        self.max_nodes = 64
+        self.node_count = 1  # the Expression root
+        self.ops: list[int] = []
+        self.consts: list[float] = []
+
+    def compile(self, tree: ast.Expression) -> _Program:
+        self._emit(tree.body)
+        return _Program(ops=tuple(self.ops), consts=tuple(self.consts))
 
-    def _bump(self) -> None:
+    def _emit(self, node: ast.AST) -> None:
         self.node_count += 1
-        if self.node_count > self.max_nodes:
+        if self.node_count > _MAX_NODES:
             raise ValueError("Expression too complex.")
 
-    def visit(self, node: ast.AST) -> Any:
-        self._bump()
-        return super().visit(node)
-
-    def visit_Expression(self, node: ast.Expression) -> float:
-        return float(self.visit(node.body))
-
-    def visit_Constant(self, node: ast.Constant) -> float:
-        if isinstance(node.value, (int, float)):
-            if math.isfinite(float(node.value)):
-                return float(node.value)
-        raise ValueError("Only finite numbers are allowed.")
-
-    def visit_UnaryOp(self, node: ast.UnaryOp) -> float:
-        val = float(self.visit(node.operand))
-        if isinstance(node.op, ast.UAdd):
-            return +val
-        if isinstance(node.op, ast.USub):
-            return -val
-        raise ValueError("Unary operator not allowed.")
-
-    def visit_BinOp(self, node: ast.BinOp) -> float:
-        left = float(self.visit(node.left))
-        right = float(self.visit(node.right))
-
-        if isinstance(node.op, ast.Add):
-            return left + right
-        if isinstance(node.op, ast.Sub):
-            return left - right
-        if isinstance(node.op, ast.Mult):
-            return left * right
-        if isinstance(node.op, ast.Div):
-            if right == 0:
-                raise ValueError("Division by zero.")
-            return left / right
-        if isinstance(node.op, ast.FloorDiv):
-            if right == 0:
-                raise ValueError("Division by zero.")
-            return left // right
-        if isinstance(node.op, ast.Mod):
-            if right == 0:
-                raise ValueError("Modulo by zero.")
-            return left % right
-        if isinstance(node.op, ast.Pow):
-            # Keep exponentiation bounded.
-            if abs(right) > 1000:
-                raise ValueError("Exponent too large.")
-            return left ** right
-
-        raise ValueError("Binary operator not allowed.")
-
-    def generic_visit(self, node: ast.AST) -> Any:
+        if isinstance(node, ast.Constant):
+            if isinstance(node.value, (int, float)) and math.isfinite(float(node.value)):
+                self.ops.append(_CONST)
+                self.consts.append(float(node.value))
+                return
+            raise ValueError("Only finite numbers are allowed.")
+
+        if isinstance(node, ast.UnaryOp):
+            self._emit(node.operand)
+            if isinstance(node.op, ast.UAdd):
+                self.ops.append(_POS)
+                return
+            if isinstance(node.op, ast.USub):
+                self.ops.append(_NEG)
+                return
+            raise ValueError("Unary operator not allowed.")
+
+        if isinstance(node, ast.BinOp):
+            self._emit(node.left)
+            self._emit(node.right)
+            op = _BINOPS.get(type(node.op))
+            if op is None:
+                raise ValueError("Binary operator not allowed.")
+            self.ops.append(op)
+            return
+
         raise ValueError(f"Disallowed syntax: {type(node).__name__}")
 
 
-def safe_calc(expr: str) -> str:
+def _binop(op: int, left: float, right: float) -> float:
+    if op == _ADD:
+        return left + right
+    if op == _SUB:
+        return left - right
+    if op == _MUL:
+        return left * right
+    if op == _DIV:
+        if right == 0:
+            raise ValueError("Division by zero.")
+        return left / right
+    if op == _FLOORDIV:
+        if right == 0:
+            raise ValueError("Division by zero.")
+        return left // right
+    if op == _MOD:
+        if right == 0:
+            raise ValueError("Modulo by zero.")
+        return left % right
+    # _POW: keep exponentiation bounded.
+    if abs(right) > 1000:
+        raise ValueError("Exponent too large.")
+    return float(left ** right)
+
+
+def _run(program: _Program) -> float:
+    stack: list[float] = []
+    consts = iter(program.consts)
+    for op in program.ops:
+        if op == _CONST:
+            stack.append(next(consts))
+        elif op == _NEG:
+            stack[-1] = -stack[-1]
+        elif op == _POS:
+            continue
+        else:
+            right = stack.pop()
+            stack[-1] = _binop(op, stack[-1], right)
+    return stack[0]
+
+
+@lru_cache(maxsize=4096)
+def _compile(normalized: str) -> _Program:
+    tree = ast.parse(normalized, mode="eval")
+    return _Compiler().compile(tree)
+
+
+def _prepare(expr: str) -> str:
     raw = (expr or "").strip()
     if not raw:
         raise ValueError("Empty expression.")
 
-    if len(raw) > 120:
+    if len(raw) > _MAX_LEN:
         raise ValueError("Expression too long.")
 
     if not _ALLOWED_CHARS.match(raw):
         raise ValueError("Expression contains disallowed characters.")
 
     # Treat '^' as exponentiation (not XOR).
-    normalized = raw.replace("^", "**")
+    return raw.replace("^", "**")
 
-    tree = ast.parse(normalized, mode="eval")
-    evaluator = _SafeEval()
-    result = evaluator.visit(tree)
 
+def _format(result: float) -> str:
     # Pretty formatting: avoid trailing .0 when integer-ish.
     if abs(result - round(result)) < 1e-12:
         return str(int(round(result)))
     return str(result)
 
 
+def safe_calc(expr: str) -> str:
+    """
+    Evaluate an arithmetic expression within the limits above.
+
+    Syntax and size checks (too complex, disallowed syntax or operators, non-finite
+    numbers) run when the expression is compiled, before any arithmetic, so they take
+    precedence over runtime errors such as "Division by zero." in the same expression.
+    """
+    program = _compile(_prepare(expr))
+    return _format(_run(program))
+
+
+def safe_calc_batch(exprs: list[str]) -> list[dict[str, str]]:
+    """
+    Evaluate many expressions with `safe_calc`.
+    Each result is {"value": ...} or {"error": ...}, like the calc scratchpad note.
+    """
+    results: list[dict[str, str]] = []
+    for expr in exprs:
+        try:
+            results.append({"value": safe_calc(expr)})
+        except Exception as e:
+            results.append({"error": str(e)})
+    return results
+
+
 # -----------------------
 # Tool: Remember Facts (LLM Extraction)
 # -----------------------
 
 @dataclass(frozen=True)
 class RememberTool:
-    llm: OpenRouterClient
+    llm: OpenRouterClient | NodeClient
 
     def extract_facts(self, user_message: str) -> dict[str, str]:
         messages = [
@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------
+# Consistent hashing
+# -----------------------
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring over worker indexes, with `replicas` virtual nodes per worker."""
+
+    def __init__(self, nodes: int, *, replicas: int = 64) -> None:
+        points = sorted((_hash(f"worker-{n}#{r}"), n) for n in range(nodes) for r in range(replicas))
+        self._keys = [p for p, _ in points]
+        self._nodes = [n for _, n in points]
+
+    def node_for(self, key: str) -> int:
+        i = bisect.bisect(self._keys, _hash(key)) % len(self._keys)
+        return self._nodes[i]
+
+
+# -----------------------
+# Worker process
+# -----------------------
+
+# Each worker reports on its own pipe; a process killed mid-write would leave a shared
+# Queue's lock held and block every other worker. Messages are (kind, key, ok, payload):
+#   ("startup", worker index, ok, error text)  once per process, after build_app()
+#   ("turn", req_id, ok, final answer or error text)
+
+def _worker_main(index: int, inbox: Any, outbox: Any, profile_dir: str) -> None:
+    # Imported here so the supervisor never builds a graph itself.
+    from .graph import build_app
+
+    try:
+        app = build_app(profile_dir=profile_dir)
+    except Exception as e:
+        outbox.send(("startup", index, False, f"{type(e).__name__}: {e}"))
+        return
+    outbox.send(("startup", index, True, ""))
+
+    while True:
+        item = inbox.get()
+        if item is None:
+            return
+
+        req_id, thread_id, user_input, resume = item
+        cfg = {"configurable": {"thread_id": thread_id}}
+        try:
+            out = _run_turn(app, cfg, user_input, resume=resume)
+            outbox.send(("turn", req_id, True, out.get("final_answer", "")))
+        except Exception as e:
+            outbox.send(("turn", req_id, False, f"{type(e).__name__}: {e}"))
+
+
+def _run_turn(app: Any, cfg: dict[str, Any], user_input: str, *, resume: bool) -> dict[str, Any]:
+    if resume:
+        snapshot = app.get_state(cfg)
+        msgs = snapshot.values.get("messages") or []
+        # The crashed worker stopped mid-turn: finish that run instead of ingesting the message again.
+        # With async durability `next` omits tasks whose writes were already saved, so check `tasks`
+        # too, and treat a trailing HumanMessage for this input as an unfinished turn.
+        if snapshot.next or snapshot.tasks or _is_input(msgs[-1:], user_input):
+            return app.invoke(None, config=cfg)
+        # The turn already finished; its result died with the worker or is still in the outbox.
+        if len(msgs) >= 2 and msgs[-1].type == "ai" and _is_input(msgs[-2:-1], user_input):
+            return snapshot.values
+    return app.invoke({"user_input": user_input}, config=cfg)
+
+
+def _is_input(msgs: list[Any], user_input: str) -> bool:
+    return bool(msgs) and msgs[0].type == "human" and msgs[0].content == user_input.strip()
+
+
+@dataclass
+class _Request:
+    shard: int
+    thread_id: str
+    user_input: str
+    future: Future
+    attempts: int = 1
+
+
+# -----------------------
+# Supervisor
+# -----------------------
+
+class WorkerPool:
+    """
+    Supervisor for N worker processes, each with its own `build_app()` instance.
+
+    Turns are routed by consistent hashing of thread_id, so a thread always runs
+    on the same worker. Thread state lives in the shared SQLite checkpoint store
+    (CHECKPOINT_DB) and profile directory, so a crashed worker is restarted and
+    its unfinished turns are resumed from their last checkpoint (once).
+
+    A dead worker is restarted right away the first time, then with exponential
+    backoff (`backoff_s` doubling up to `max_backoff_s`) while it keeps failing.
+    After `max_restarts` consecutive failures its shard is marked down and its
+    turns fail with the last startup error instead of looping forever.
+
+    `invoke(input, config)` mirrors the compiled graph, so a TurnCoalescer can sit in front.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        *,
+        replicas: int = 64,
+        poll_s: float = 1.0,
+        max_restarts: int = 5,
+        backoff_s: float = 1.0,
+        max_backoff_s: float = 30.0,
+    ) -> None:
+        settings = Settings.load()
+        if not settings.checkpoint_db:
+            raise RuntimeError("Worker mode needs a durable checkpoint store. Set CHECKPOINT_DB in .env")
+        # Profiles must survive restarts too; keep them next to the checkpoint DB by default.
+        self.profile_dir = settings.profile_store_dir or f"{settings.checkpoint_db}.profiles"
+
+        self.size = max(1, workers or os.cpu_count() or 1)
+        self.ring = HashRing(self.size, replicas=replicas)
+        self.poll_s = poll_s
+        self.max_restarts = max_restarts
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.restarts = 0
+
+        self._ctx = mp.get_context("spawn")
+        self._outboxes: set[Any] = set()
+        self._inboxes: list[Any] = [None] * self.size
+        self._procs: list[Any] = [None] * self.size
+        # Per-worker restart bookkeeping (guarded by _lock).
+        self._ready = [False] * self.size
+        self._failures = [0] * self.size
+        self._restart_at: list[float | None] = [None] * self.size
+        self._errors: list[str | None] = [None] * self.size
+        self._down: list[str | None] = [None] * self.size
+        self._inflight: dict[int, _Request] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        for i in range(self.size):
+            self._start(i)
+
+        threading.Thread(target=self._collect, name="worker-collector", daemon=True).start()
+        threading.Thread(target=self._monitor, name="worker-monitor", daemon=True).start()
+
+    def submit(self, thread_id: str, user_input: str) -> Future:
+        if self._closed.is_set():
+            raise RuntimeError("WorkerPool is closed.")
+
+        fut: Future = Future()
+        shard = self.ring.node_for(thread_id)
+        with self._lock:
+            if self._down[shard] is not None:
+                fut.set_exception(RuntimeError(self._down[shard]))
+                return fut
+            req_id = next(self._ids)
+            self._inflight[req_id] = _Request(shard=shard, thread_id=thread_id, user_input=user_input, future=fut)
+            self._inboxes[shard].put((req_id, thread_id, user_input, False))
+        return fut
+
+    def invoke(self, input: dict[str, Any], config: dict[str, Any]) -> dict[str, Any]:
+        thread_id = str(config["configurable"]["thread_id"])
+        answer = self.submit(thread_id, input.get("user_input", "")).result()
+        return {"final_answer": answer}
+
+    def close(self, timeout_s: float = 10.0) -> None:
+        self._closed.set()
+        with self._lock:
+            for inbox in self._inboxes:
+                inbox.put(None)
+        for proc in self._procs:
+            proc.join(timeout_s)
+            if proc.is_alive():
+                proc.terminate()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # --- internals
+
+    def _start(self, index: int) -> None:
+        inbox = self._ctx.Queue()
+        outbox, sender = self._ctx.Pipe(duplex=False)
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(index, inbox, sender, self.profile_dir),
+            name=f"agent-worker-{index}",
+            daemon=True,
+        )
+        proc.start()
+        # Only the worker holds the write end, so its exit shows up as EOF here.
+        sender.close()
+        self._outboxes.add(outbox)
+        self._inboxes[index] = inbox
+        self._procs[index] = proc
+        self._ready[index] = False
+
+    def _collect(self) -> None:
+        while True:
+            with self._lock:
+                outboxes = list(self._outboxes)
+            ready = wait(outboxes, timeout=self.poll_s)
+            if not ready and self._closed.is_set():
+                return
+            for outbox in ready:
+                self._receive(outbox)
+
+    def _receive(self, outbox: Any) -> None:
+        try:
+            kind, key, ok, payload = outbox.recv()
+        except (EOFError, OSError):
+            # The worker exited and its pipe is drained; the monitor restarts it.
+            with self._lock:
+                self._outboxes.discard(outbox)
+            outbox.close()
+            return
+
+        if kind == "startup":
+            with self._lock:
+                if ok:
+                    self._ready[key] = True
+                    self._failures[key] = 0
+                    self._errors[key] = None
+                else:
+                    self._errors[key] = payload
+            if not ok:
+                logger.error("Worker %d failed to start: %s", key, payload)
+            return
+
+        with self._lock:
+            req = self._inflight.pop(key, None)
+        if req is None:
+            return
+        if ok:
+            req.future.set_result(payload)
+        else:
+            req.future.set_exception(RuntimeError(payload))
+
+    def _monitor(self) -> None:
+        while not self._closed.wait(self.poll_s):
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                now = time.monotonic()
+                for index, proc in enumerate(self._procs):
+                    if self._down[index] is not None or proc.is_alive():
+                        continue
+
+                    if self._restart_at[index] is None:
+                        self._failures[index] += 1
+                        if self._failures[index] > self.max_restarts:
+                            self._mark_down(index, proc.exitcode)
+                            continue
+                        # First restart is immediate; repeated failures back off exponentially.
+                        delay = self.backoff_s * 2 ** (self._failures[index] - 2) if self._failures[index] > 1 else 0.0
+                        self._restart_at[index] = now + min(delay, self.max_backoff_s)
+
+                    if now >= self._restart_at[index]:
+                        self._restart_at[index] = None
+                        self.restarts += 1
+                        # Only a worker that got past startup can have crashed on a turn.
+                        crashed_on_turn = self._ready[index]
+                        self._start(index)
+                        self._resubmit(index, count_attempt=crashed_on_turn)
+
+    def _mark_down(self, index: int, exitcode: int | None) -> None:
+        # Caller holds the lock.
+        reason = self._errors[index] or f"exit code {exitcode}"
+        self._down[index] = f"Worker {index} is down after {self.max_restarts} failed restarts: {reason}"
+        logger.error(self._down[index])
+        for req_id in [r for r, req in self._inflight.items() if req.shard == index]:
+            self._inflight.pop(req_id).future.set_exception(RuntimeError(self._down[index]))
+
+    def _resubmit(self, index: int, *, count_attempt: bool = True) -> None:
+        # Caller holds the lock. The dead worker's queue went with it; replay its turns in order,
+        # resuming from the last checkpoint rather than starting them over.
+        for req_id in sorted(r for r, req in self._inflight.items() if req.shard == index):
+            req = self._inflight[req_id]
+            if count_attempt:
+                if req.attempts > 1:
+                    del self._inflight[req_id]
+                    req.future.set_exception(RuntimeError(f"Worker {index} crashed twice on this turn."))
+                    continue
+                req.attempts += 1
+            self._inboxes[index].put((req_id, req.thread_id, req.user_input, True))
@@ -52,6 +52,8 @@ def main() -> None:
     lines.append(f"- thread_id: `{args.thread_id}`\n")
     lines.append("\n---\n")
 
+    skipped = 0
+
     for i, user in enumerate(TESTS, start=1):
         lines.append(f"## Test {i}\n")
         lines.append(f"**Input:** `{md_escape(user)}`\n\n")
@@ -89,11 +91,15 @@ def main() -> None:
             if final_answer and final_answer != last_final:
                 last_final = final_answer
 
+            skipped = int(state.get("llm_calls_skipped") or skipped)
+
         # The last run already produced the answer; pull from last_final.
         lines.append("**Final answer:**\n\n")
         lines.append(f"{last_final or ''}\n\n")
         lines.append("---\n")
 
+    lines.append(f"\n- Final LLM calls skipped by template answers: {skipped}\n")
+
     with open(args.out, "w", encoding="utf-8") as f:
         f.write("".join(lines))
 
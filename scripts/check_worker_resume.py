@@ -0,0 +1,84 @@
+from __future__ import annotations
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Crash/resume regression check for worker mode (no network, no API key needed).
+# A child process runs a turn with a stubbed LLM and hard-exits inside the final node;
+# the parent then replays the turn the way a restarted worker does and checks that the
+# message was ingested once and the turn was finished from its checkpoint.
+
+import argparse
+import json
+import multiprocessing as mp
+import tempfile
+
+from branching_agent.openrouter import OpenRouterClient
+from branching_agent.prompts import FINAL_SYSTEM, PLANNER_SYSTEM
+
+MESSAGE = "What is (2+3)*4 and what does it mean?"
+
+
+def stub_llm(crash_in_final: bool) -> None:
+    def chat_completion(self, messages, **kwargs):
+        system, user = messages[0]["content"], messages[-1]["content"]
+        if system == PLANNER_SYSTEM:
+            if "'scratchpad': []" in user:
+                return json.dumps({"next": "calc", "tool_input": "(2+3)*4", "reason": "math"})
+            return json.dumps({"next": "final", "tool_input": "", "reason": "done"})
+        if system == FINAL_SYSTEM:
+            if crash_in_final:
+                os._exit(1)
+            return "It is 20."
+        return "{}"
+
+    OpenRouterClient.chat_completion = chat_completion
+
+
+def crashing_turn(thread_id: str) -> None:
+    from branching_agent.graph import build_app
+
+    stub_llm(crash_in_final=True)
+    build_app().invoke({"user_input": MESSAGE}, config={"configurable": {"thread_id": thread_id}})
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Crash a worker turn mid-run and check that it resumes without re-ingesting.")
+    ap.add_argument("--rounds", type=int, default=5, help="Crash/resume rounds, each on a fresh thread_id.")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="worker-resume-")
+    os.environ.update(
+        {
+            "OPENROUTER_API_KEY": "stub",
+            "CHECKPOINT_DB": os.path.join(workdir, "checkpoints.sqlite"),
+            "PROFILE_STORE_DIR": os.path.join(workdir, "profiles"),
+            "TEMPLATE_ANSWERS": "0",
+        }
+    )
+
+    from branching_agent.graph import build_app
+    from branching_agent.workers import _run_turn
+
+    stub_llm(crash_in_final=False)
+    app = build_app()
+    ctx = mp.get_context("spawn")
+
+    failures = 0
+    for n in range(args.rounds):
+        thread_id = f"resume-{n}"
+        proc = ctx.Process(target=crashing_turn, args=(thread_id,))
+        proc.start()
+        proc.join()
+
+        cfg = {"configurable": {"thread_id": thread_id}}
+        out = _run_turn(app, cfg, MESSAGE, resume=True)
+        humans = [m for m in out.get("messages") or [] if m.type == "human"]
+        ok = proc.exitcode == 1 and len(humans) == 1 and out.get("final_answer") == "It is 20."
+        failures += not ok
+        print(f"{thread_id}: exit={proc.exitcode} human_messages={len(humans)} answer={out.get('final_answer')!r} {'OK' if ok else 'FAIL'}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import argparse
+import json
+import threading
+from dotenv import load_dotenv
+
+from branching_agent import TurnCoalescer, WorkerPool
+from branching_agent.config import Settings
+
+
+def main() -> None:
+    load_dotenv()
+
+    ap = argparse.ArgumentParser(description="Sharded worker mode. Reads JSON lines {thread_id, user_input} from stdin.")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument(
+        "--coalesce-ms",
+        type=int,
+        default=Settings.load().coalesce_window_ms,
+        help="Merge messages on the same thread_id within this window into one turn (0 = off).",
+    )
+    args = ap.parse_args()
+
+    print_lock = threading.Lock()
+
+    def emit(record: dict) -> None:
+        with print_lock:
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+
+    with WorkerPool(args.workers) as pool:
+        front = TurnCoalescer(pool, window_s=args.coalesce_ms / 1000) if args.coalesce_ms > 0 else None
+        pending = []
+        for n, line in enumerate(sys.stdin):
+            line = line.strip()
+            if not line:
+                continue
+            req = json.loads(line)
+            req_id = req.get("id", n)
+            thread_id = str(req.get("thread_id", "demo"))
+            user_input = str(req.get("user_input", ""))
+            fut = front.submit(thread_id, user_input) if front else pool.submit(thread_id, user_input)
+
+            def done(f, req_id=req_id) -> None:
+                if f.exception() is not None:
+                    emit({"id": req_id, "error": str(f.exception())})
+                else:
+                    # The coalescer resolves to pool.invoke()'s dict, the pool itself to the answer.
+                    out = f.result()
+                    answer = out.get("final_answer", "") if isinstance(out, dict) else out
+                    emit({"id": req_id, "final_answer": answer})
+
+            fut.add_done_callback(done)
+            pending.append(fut)
+
+        for fut in pending:
+            fut.exception()
+
+
+if __name__ == "__main__":
+    main()